@@ -5,33 +5,33 @@ Convert between video formats (MP4, MOV, MKV, WEBM, AVI) and create high-quality
 Built with CustomTkinter for iOS-inspired design
 """
 
+import argparse
+import asyncio
+import atexit
+import collections
+import functools
+import hashlib
+import json
 import os
+import platform
+import queue
 import re
 import sys
 import random
+import shutil
+import signal
+import sqlite3
+import subprocess
+import tempfile
 import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
 import warnings
 
 import customtkinter as ctk
 from tkinter import filedialog, messagebox
 
-try:
-    from PIL import Image
-except ImportError:
-    Image = None
-
-
-def ensure_antialias_compat():
-    """Ensure PIL.Image exposes ANTIALIAS to satisfy MoviePy legacy usage."""
-    if Image is None:
-        return
-
-    resampling = getattr(Image, "Resampling", None)
-    if resampling and not hasattr(Image, "ANTIALIAS"):
-        setattr(Image, "ANTIALIAS", getattr(resampling, "LANCZOS", resampling.LANCZOS))
-
-
 warnings.filterwarnings(
     "ignore",
     message=r"resource_tracker: There appear to be .* leaked semaphore objects to clean up at shutdown: .*",
@@ -44,43 +44,202 @@ def _append_warning_filter_env():
     """Add a PYTHONWARNINGS rule to ignore resource_tracker warnings in child processes."""
     filter_rule = "ignore::UserWarning:multiprocessing.resource_tracker"
     existing = os.environ.get("PYTHONWARNINGS", "")
-    rules = [rule for rule in existing.split(",") if rule]
+    # Insertion-ordered dict: constant-time lookup, existing rule order preserved
+    rules = dict.fromkeys(rule for rule in existing.split(",") if rule)
     if filter_rule in rules:
         return
-    rules.append(filter_rule)
+    rules[filter_rule] = None
     os.environ["PYTHONWARNINGS"] = ",".join(rules)
 
 
 _append_warning_filter_env()
 
-# Try to import moviepy with helpful error message
-try:
-    from moviepy.editor import VideoFileClip
-except ImportError as e:
+
+def ensure_ffmpeg_available():
+    """Exit with install instructions if ffmpeg or ffprobe is not on the PATH."""
+    missing = [tool for tool in ("ffmpeg", "ffprobe") if shutil.which(tool) is None]
+    if not missing:
+        return
+
     print("=" * 60)
-    print("ERROR: moviepy is not installed or cannot be imported!")
+    print(f"ERROR: {' and '.join(missing)} not found on the PATH!")
     print("=" * 60)
-    print(f"\nImport error details: {e}")
-    print(f"\nPython path: {sys.executable}")
-    print(f"Python version: {sys.version}")
-    
-    # Check if we're in a virtual environment
-    if hasattr(sys, 'real_prefix') or (hasattr(sys, 'base_prefix') and sys.base_prefix != sys.prefix):
-        print(f"\n✓ Virtual environment detected: {sys.prefix}")
-        print("\nInstall in your virtual environment:")
-        print(f"  {sys.executable} -m pip install -r requirements.txt")
-    else:
-        print("\nInstall moviepy and dependencies:")
-        print("  pip3 install moviepy imageio imageio-ffmpeg customtkinter")
-        print("\nOr install all requirements:")
-        print("  pip3 install -r requirements.txt")
-    
-    print("\nAlso make sure FFmpeg is installed:")
+    print("\nInstall FFmpeg (includes ffprobe):")
     print("  macOS: brew install ffmpeg")
     print("  Linux: sudo apt-get install ffmpeg")
+    print("  Windows: https://ffmpeg.org/download.html (add it to PATH)")
     print("=" * 60)
     sys.exit(1)
 
+
+# Hardware H.264 encoders to try, in order of preference, per platform
+HW_H264_ENCODERS = {
+    'darwin': ('h264_videotoolbox',),
+    'win32': ('h264_nvenc', 'h264_qsv', 'h264_amf'),
+    'linux': ('h264_nvenc', 'h264_qsv', 'h264_vaapi'),
+}
+
+# Names shown in the hardware acceleration menu
+HW_ENCODER_LABELS = {
+    'h264_videotoolbox': 'Apple VideoToolbox',
+    'h264_nvenc': 'NVIDIA NVENC',
+    'h264_qsv': 'Intel Quick Sync',
+    'h264_amf': 'AMD AMF',
+    'h264_vaapi': 'VAAPI',
+}
+
+# Quality settings per hardware encoder, shared by real encodes and the startup test.
+# VideoToolbox only takes a constant quality (-q:v) on Apple Silicon
+HW_ENCODER_ARGS = {
+    'h264_videotoolbox': ['-q:v', '65'] if platform.machine() == 'arm64' else ['-b:v', '8M'],
+    'h264_nvenc': ['-preset', 'p4', '-cq', '23'],
+    'h264_qsv': ['-global_quality', '23'],
+    'h264_amf': ['-quality', 'balanced'],
+    'h264_vaapi': ['-vf', 'format=nv12|vaapi,hwupload', '-qp', '23'],
+}
+
+
+def hw_encoder_works(encoder):
+    """Check that a hardware encoder can really encode here with a tiny test clip.
+
+    Stock ffmpeg builds list NVENC, Quick Sync and VAAPI even without the hardware or driver.
+    """
+    # Same options as a real encode, so settings the hardware rejects fail here too
+    encoder_args = HW_ENCODER_ARGS.get(encoder, [])
+    filter_args = [] if '-vf' in encoder_args else ['-vf', 'format=nv12']
+    device_args = ['-vaapi_device', '/dev/dri/renderD128'] if encoder == 'h264_vaapi' else []
+    try:
+        result = subprocess.run(
+            [
+                'ffmpeg', '-hide_banner', '-loglevel', 'error', *device_args,
+                '-f', 'lavfi', '-i', 'color=s=256x256:d=0.2',
+                *filter_args, '-c:v', encoder, *encoder_args, '-f', 'null', '-'
+            ],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            timeout=15
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+    return result.returncode == 0
+
+
+@functools.lru_cache(maxsize=None)
+def detect_hw_encoders():
+    """Return the hardware H.264 encoders that work with the local ffmpeg build, best first."""
+    try:
+        result = subprocess.run(
+            ['ffmpeg', '-hide_banner', '-encoders'],
+            capture_output=True,
+            text=True
+        )
+    except OSError:
+        return ()
+
+    available = set()
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        if len(parts) >= 2:
+            available.add(parts[1])
+
+    candidates = HW_H264_ENCODERS.get(sys.platform, HW_H264_ENCODERS['linux'])
+    return tuple(encoder for encoder in candidates if encoder in available and hw_encoder_works(encoder))
+
+
+@functools.lru_cache(maxsize=None)
+def detect_nvidia_gpu_count():
+    """Return the number of NVIDIA GPUs reported by nvidia-smi (0 if unavailable)."""
+    try:
+        result = subprocess.run(['nvidia-smi', '-L'], capture_output=True, text=True)
+    except OSError:
+        return 0
+    return sum(1 for line in result.stdout.splitlines() if line.startswith('GPU '))
+
+
+@functools.lru_cache(maxsize=512)
+def probe_media(path, mtime_ns, size):
+    """Run ffprobe once and return the metadata the converter needs.
+
+    mtime_ns and size only take part in the cache key, so an edited file is probed again.
+    """
+    result = subprocess.run(
+        [
+            'ffprobe', '-v', 'error',
+            '-show_entries',
+            'stream=codec_type,codec_name,pix_fmt,width,height:stream_tags=rotate:'
+            'stream_side_data=rotation:format=duration',
+            '-of', 'json',
+            path
+        ],
+        capture_output=True,
+        text=True
+    )
+    try:
+        data = json.loads(result.stdout or "{}")
+    except ValueError:
+        data = {}
+
+    video = next((s for s in data.get('streams', []) if s.get('codec_type') == 'video'), {})
+    audio = next((s for s in data.get('streams', []) if s.get('codec_type') == 'audio'), {})
+    try:
+        duration = float(data.get('format', {}).get('duration'))
+    except (TypeError, ValueError):
+        duration = None
+
+    # Phones store portrait video as landscape plus a rotation (display matrix, or a
+    # rotate tag on older files); ffmpeg rotates frames before any filter runs, so
+    # report the size as displayed
+    width, height = video.get('width'), video.get('height')
+    rotation = video.get('tags', {}).get('rotate')
+    for side_data in video.get('side_data_list', []):
+        if 'rotation' in side_data:
+            rotation = side_data['rotation']
+    try:
+        rotation = int(float(rotation or 0))
+    except (TypeError, ValueError):
+        rotation = 0
+    if abs(rotation) % 180 == 90:
+        width, height = height, width
+
+    return {
+        'video_codec': video.get('codec_name'),
+        'pix_fmt': video.get('pix_fmt'),
+        'audio_codec': audio.get('codec_name'),
+        'width': width,
+        'height': height,
+        'duration': duration,
+    }
+
+
+def open_convert_cache():
+    """Open the database of finished conversions, creating it if needed; None if unavailable"""
+    if sys.platform == 'darwin':
+        base = Path.home() / 'Library' / 'Caches'
+    elif sys.platform == 'win32':
+        base = Path(os.environ.get('LOCALAPPDATA') or Path.home() / 'AppData' / 'Local')
+    else:
+        base = Path(os.environ.get('XDG_CACHE_HOME') or Path.home() / '.cache')
+    try:
+        cache_dir = base / 'video-format-converter'
+        cache_dir.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(str(cache_dir / 'convert_cache.db'))
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS conversions "
+            "(key TEXT PRIMARY KEY, output TEXT, size INTEGER, mtime_ns INTEGER)"
+        )
+        return connection
+    except (OSError, sqlite3.Error):
+        return None
+
+
+@dataclass
+class FileEntry:
+    """A selected input file, resolved once when it is picked"""
+    input_path: Path
+    out_dir: Path
+    out_stem: str
+
+
 # Set appearance mode and color theme
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
@@ -93,8 +252,73 @@ class VideoConverterApp:
     
     VIDEO_FORMATS = ['MP4', 'MOV', 'MKV', 'WEBM', 'AVI', 'GIF']
     
+    # FFmpeg (video, audio) encoders per target container (GIF is handled separately)
+    VIDEO_CODECS = {
+        'MP4': ('libx264', 'aac'),
+        'MOV': ('libx264', 'aac'),
+        'MKV': ('libx264', 'aac'),
+        'WEBM': ('libvpx', 'libvorbis'),
+        'AVI': ('mpeg4', 'libvorbis'),
+    }
+    
+    # Extra encoder options, including the hardware encoders' quality settings
+    ENCODER_ARGS = {
+        # libx264 takes -preset/-crf from the Video Settings card instead
+        'libvpx': ['-deadline', 'good', '-cpu-used', '4'],
+        **HW_ENCODER_ARGS,
+    }
+    
+    # Options that must precede -i for a hardware encoder: decode on the same device
+    # and keep frames in GPU memory between decoder and encoder
+    ENCODER_INPUT_ARGS = {
+        'h264_nvenc': ['-hwaccel', 'cuda', '-hwaccel_output_format', 'cuda'],
+        'h264_vaapi': [
+            '-vaapi_device', '/dev/dri/renderD128',
+            '-hwaccel', 'vaapi', '-hwaccel_output_format', 'vaapi'
+        ],
+    }
+    
+    # Output pixel format per encoder (default yuv420p: 8-bit 4:2:0 for every software
+    # encoder); None where frames stay on the GPU (NVENC, VAAPI) and a -pix_fmt
+    # conversion would force a download
+    ENCODER_PIX_FMTS = {
+        'h264_nvenc': None,
+        'h264_qsv': 'nv12',
+        'h264_vaapi': None,
+    }
+    
+    # Speed presets offered for libx264, fastest first
+    X264_PRESETS = ('ultrafast', 'veryfast', 'fast', 'medium', 'slow')
+    
+    # Containers that get their index moved to the front for instant playback
+    FASTSTART_FORMATS = {'MP4', 'MOV'}
+    
+    # Containers that can take H.264/H.265 + AAC streams without re-encoding
+    REMUX_FORMATS = {'MP4', 'MOV', 'MKV'}
+    REMUX_VIDEO_CODECS = {'h264', 'hevc'}
+    REMUX_AUDIO_CODECS = {'aac'}
+    # Only 8-bit 4:2:0 is copied; anything else is re-encoded to yuv420p so it plays everywhere
+    REMUX_PIX_FMTS = {'yuv420p', 'yuvj420p'}
+    
+    # Most decoded GIF frames one ffmpeg may buffer for the single-pass palette (256 MB)
+    GIF_SINGLE_PASS_MAX_BYTES = 256 << 20
+    
+    # Interval of the master UI timer (10 Hz)
+    TICK_MS = 100
+    
+    # Pipe buffer size for ffmpeg subprocesses (1 MB)
+    FFMPEG_PIPE_BUFSIZE = 1 << 20
+    
+    # Home directory and the folders shown by name in get_display_path
+    _HOME = Path.home()
+    _HOME_STR = os.path.normpath(str(_HOME))
+    _COMMON_DIRS = frozenset({'Desktop', 'Documents', 'Downloads', 'Pictures', 'Videos'})
+    
+    # Starting folder for the file and folder dialogs
+    _DEFAULT_DIR = str(_HOME / "Documents")
+    
     # Funny status messages to display during conversion (Claude Code style)
-    THINKING_MESSAGES = [
+    THINKING_MESSAGES = (
         "🎬 Wrangling pixels into submission...",
         "🔧 Teaching bits new dance moves...",
         "🎨 Convincing frames to get along...",
@@ -195,33 +419,64 @@ class VideoConverterApp:
         "🔮 Fortune favors the encoded...",
         "🎸 Encoding solo in progress...",
         "🧁 Fresh out of the oven soon...",
-    ]
+    )
     
-    def __init__(self, root):
+    def __init__(self, root, threads_per_job=None):
         self.root = root
         self.root.title("Video Converter")
         self.root.geometry("900x900")
-        ensure_antialias_compat()
         
         # Set minimum window size
         self.root.minsize(850, 975)
         
         self.selected_files = []
         self.output_folder = None
-        self.last_input_dir = os.path.expanduser("~/Documents")
-        self.last_output_dir = os.path.expanduser("~/Documents")
+        self.last_input_dir = self._DEFAULT_DIR
+        self.last_output_dir = self._DEFAULT_DIR
+        
+        # Optional user override for ffmpeg -threads per conversion
+        self.threads_per_job = threads_per_job
+        
+        # Hardware encoders are probed once at startup, in the background (test
+        # encodes can take seconds); the menu is filled in when they finish
+        self.hw_encoders = ()
+        
+        # Per-file progress (0.0-1.0) reported by ffmpeg, keyed by input path
+        self.file_progress = {}
+        # Last value pushed to the progress bar, and when
+        self._last_progress_ts = 0.0
+        self._last_progress_val = 0.0
         
-        # Simulated progress tracking
-        self.simulated_progress = 0.0
-        self.simulated_progress_running = False
-        self.current_file_start_progress = 0.0
-        self.current_file_end_progress = 0.0
+        # Finished-conversion cache, open only while a batch runs
+        self._cache = None
         
-        # Funny message tracking
+        # Running ffmpeg processes and their partial outputs (shared with the batch
+        # thread), so closing the app can stop them and delete the leftovers
+        self._jobs_lock = threading.Lock()
+        self._active_processes = set()
+        self._partial_paths = set()
+        self._closing = False
+        
+        # Funny message tracking (tick at which the next message is due)
         self.funny_message_running = False
-        self.used_messages = []
+        self._next_funny_tick = 0
+        self.message_iter = iter(())
+        self.recent_messages = collections.deque(maxlen=10)
+        
+        # Status log lines waiting to be written in one batch (filled from any thread)
+        self._log_queue = queue.SimpleQueue()
         
         self.setup_ui()
+        
+        # One master timer drives every UI animation
+        self._tick = 0
+        self._ticker()
+        
+        threading.Thread(target=self._detect_hw_encoders, daemon=True).start()
+        
+        # ffmpeg runs in its own session, so it outlives the app unless stopped
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        atexit.register(self._stop_jobs)
     
     def setup_ui(self):
         """Create the modern user interface with CustomTkinter"""
@@ -400,6 +655,11 @@ class VideoConverterApp:
         
         current_row += 1  # Move past cards row
         
+        # Parallel jobs setting, shared by the GIF and video settings cards
+        self.max_parallel_jobs = max(2, os.cpu_count() or 2)
+        self.parallel_jobs_var = ctk.IntVar(value=self._pool_workers())
+        self.parallel_jobs_value_labels = []
+        
         # GIF Quality Settings (show when GIF is selected, below the cards)
         self.gif_settings_frame = ctk.CTkFrame(main_frame, corner_radius=15)
         
@@ -530,6 +790,110 @@ class VideoConverterApp:
 
         self.max_width_slider = max_width_slider
         self.update_full_width_state()
+        self._add_parallel_jobs_slider(self.gif_settings_frame, row=5)
+        
+        # Video Settings (shown for every format except GIF, same row as GIF settings)
+        self.video_settings_frame = ctk.CTkFrame(main_frame, corner_radius=15)
+        
+        video_settings_label = ctk.CTkLabel(
+            self.video_settings_frame,
+            text="Video Settings",
+            font=ctk.CTkFont(size=14, weight="bold")
+        )
+        video_settings_label.grid(row=0, column=0, padx=20, pady=(15, 10), sticky="w")
+        
+        hwaccel_frame = ctk.CTkFrame(self.video_settings_frame, fg_color="transparent")
+        hwaccel_frame.grid(row=1, column=0, padx=20, pady=(0, 10), sticky="ew")
+        
+        hwaccel_label = ctk.CTkLabel(
+            hwaccel_frame,
+            text="Hardware Acceleration:",
+            font=ctk.CTkFont(size=12)
+        )
+        hwaccel_label.pack(side="left", padx=(0, 15))
+        
+        # Disabled until _set_hw_encoders fills in the working encoders
+        self.hwaccel_options = {"Off": None}
+        self.default_hwaccel = "Detecting..."
+        
+        self.hwaccel_var = ctk.StringVar(value=self.default_hwaccel)
+        self.hwaccel_menu = ctk.CTkOptionMenu(
+            hwaccel_frame,
+            values=list(self.hwaccel_options),
+            variable=self.hwaccel_var,
+            width=180,
+            font=ctk.CTkFont(size=12),
+            fg_color="#2A7AE8",
+            button_color="#2A7AE8",
+            button_hover_color="#1e5fb8",
+            state="disabled"
+        )
+        self.hwaccel_menu.pack(side="left")
+        
+        # x264 speed/quality trade-off (hardware encoders use their own settings)
+        preset_frame = ctk.CTkFrame(self.video_settings_frame, fg_color="transparent")
+        preset_frame.grid(row=2, column=0, padx=20, pady=(0, 10), sticky="ew")
+        
+        preset_label = ctk.CTkLabel(
+            preset_frame,
+            text="Speed Preset:",
+            font=ctk.CTkFont(size=12)
+        )
+        preset_label.pack(side="left", padx=(0, 15))
+        
+        self.preset_var = ctk.StringVar(value="veryfast")
+        preset_menu = ctk.CTkOptionMenu(
+            preset_frame,
+            values=list(self.X264_PRESETS),
+            variable=self.preset_var,
+            width=180,
+            font=ctk.CTkFont(size=12),
+            fg_color="#2A7AE8",
+            button_color="#2A7AE8",
+            button_hover_color="#1e5fb8"
+        )
+        preset_menu.pack(side="left")
+        
+        crf_frame = ctk.CTkFrame(self.video_settings_frame, fg_color="transparent")
+        crf_frame.grid(row=3, column=0, padx=20, pady=(0, 10), sticky="ew")
+        
+        crf_label = ctk.CTkLabel(
+            crf_frame,
+            text="Quality (CRF):",
+            font=ctk.CTkFont(size=12)
+        )
+        crf_label.pack(side="left", padx=(0, 15))
+        
+        self.crf_var = ctk.IntVar(value=23)
+        self.crf_value_label = ctk.CTkLabel(
+            crf_frame,
+            text="23",
+            font=ctk.CTkFont(size=12, weight="bold"),
+            width=30
+        )
+        self.crf_value_label.pack(side="right", padx=(10, 0))
+        
+        crf_slider = ctk.CTkSlider(
+            crf_frame,
+            from_=15,
+            to=35,
+            number_of_steps=20,
+            variable=self.crf_var,
+            command=self.update_crf_label,
+            width=200
+        )
+        crf_slider.pack(side="left", padx=(0, 10))
+        
+        crf_info = ctk.CTkLabel(
+            self.video_settings_frame,
+            text="💡 Slower presets and lower CRF = better quality but longer conversions",
+            font=ctk.CTkFont(size=11),
+            text_color=("gray60", "gray60")
+        )
+        crf_info.grid(row=4, column=0, padx=20, pady=(0, 15), sticky="w")
+        
+        self._add_parallel_jobs_slider(self.video_settings_frame, row=5)
+        
         # Store row numbers for dynamic placement
         self.gif_settings_row = current_row
         self.status_label_row = current_row + 1  # "Converting X of Y" above button
@@ -605,6 +969,78 @@ class VideoConverterApp:
             activate_scrollbars=True
         )
         self.status_text.grid(row=1, column=0, padx=20, pady=(0, 20), sticky="nsew")
+        
+        # Non-modal "done" toast, floated over the top of the window when shown
+        self.toast = ctk.CTkFrame(self.root, corner_radius=12, fg_color=("#2ecc71", "#27ae60"))
+        self.toast_label = ctk.CTkLabel(
+            self.toast,
+            text="",
+            font=ctk.CTkFont(size=13, weight="bold"),
+            text_color="white"
+        )
+        self.toast_label.pack(padx=20, pady=10)
+        self.reset_after_id = None
+        
+        # Show the settings card for the default format
+        self.on_format_change(self.format_var.get())
+    
+    def _detect_hw_encoders(self):
+        """Probe the hardware encoders (background thread) and hand them to the UI"""
+        self._ui(self._set_hw_encoders, detect_hw_encoders())
+    
+    def _set_hw_encoders(self, encoders):
+        """Fill the Hardware Acceleration menu with "Off" plus every working encoder, best first"""
+        self.hw_encoders = encoders
+        self.hwaccel_options = {"Off": None}
+        for encoder in encoders:
+            self.hwaccel_options[HW_ENCODER_LABELS.get(encoder, encoder)] = encoder
+        self.default_hwaccel = list(self.hwaccel_options)[1] if encoders else "Off"
+        self.hwaccel_menu.configure(
+            values=list(self.hwaccel_options),
+            state="normal" if encoders else "disabled"
+        )
+        self.hwaccel_var.set(self.default_hwaccel)
+    
+    def _add_parallel_jobs_slider(self, parent, row):
+        """Add a Parallel Jobs slider bound to the shared parallel_jobs_var"""
+        jobs_frame = ctk.CTkFrame(parent, fg_color="transparent")
+        jobs_frame.grid(row=row, column=0, padx=20, pady=(0, 15), sticky="ew")
+        
+        jobs_label = ctk.CTkLabel(
+            jobs_frame,
+            text="Parallel Jobs:",
+            font=ctk.CTkFont(size=12)
+        )
+        jobs_label.pack(side="left", padx=(0, 15))
+        
+        jobs_value_label = ctk.CTkLabel(
+            jobs_frame,
+            text=str(self.parallel_jobs_var.get()),
+            font=ctk.CTkFont(size=12, weight="bold"),
+            width=30
+        )
+        jobs_value_label.pack(side="right", padx=(10, 0))
+        self.parallel_jobs_value_labels.append(jobs_value_label)
+        
+        jobs_slider = ctk.CTkSlider(
+            jobs_frame,
+            from_=1,
+            to=self.max_parallel_jobs,
+            number_of_steps=self.max_parallel_jobs - 1,
+            variable=self.parallel_jobs_var,
+            command=self.update_parallel_jobs_label,
+            width=200
+        )
+        jobs_slider.pack(side="left", padx=(0, 10))
+    
+    def update_parallel_jobs_label(self, value):
+        """Update both Parallel Jobs labels when either slider changes"""
+        for label in self.parallel_jobs_value_labels:
+            label.configure(text=str(int(float(value))))
+    
+    def update_crf_label(self, value):
+        """Update CRF label when slider changes"""
+        self.crf_value_label.configure(text=str(int(float(value))))
     
     def update_fps_label(self, value):
         """Update FPS label when slider changes"""
@@ -625,12 +1061,14 @@ class VideoConverterApp:
         self.max_width_slider.configure(state=state)
     
     def on_format_change(self, choice):
-        """Show/hide GIF settings based on format selection"""
+        """Show the GIF or video settings card based on format selection"""
         if choice == 'GIF':
             # Place GIF settings below the three cards, spanning all columns
+            self.video_settings_frame.grid_remove()
             self.gif_settings_frame.grid(row=self.gif_settings_row, column=0, columnspan=3, pady=(0, 10), sticky="ew")
         else:
             self.gif_settings_frame.grid_remove()
+            self.video_settings_frame.grid(row=self.gif_settings_row, column=0, columnspan=3, pady=(0, 10), sticky="ew")
     
     def select_files(self):
         """Open file dialog to select videos"""
@@ -651,10 +1089,10 @@ class VideoConverterApp:
         )
         
         if files:
-            self.selected_files = list(files)
+            self.selected_files = [self._make_file_entry(Path(file)) for file in files]
             # Update last used directory
             if self.selected_files:
-                self.last_input_dir = os.path.dirname(self.selected_files[0])
+                self.last_input_dir = str(self.selected_files[0].input_path.parent)
             
             count = len(self.selected_files)
             self.files_label.configure(
@@ -670,31 +1108,32 @@ class VideoConverterApp:
             
             self.log_status(f"Selected {count} file(s) for conversion")
     
+    def _resolve_out_dir(self, input_path):
+        """Return the folder a converted file goes to: the chosen output folder or its source folder"""
+        return Path(self.output_folder) if self.output_folder else input_path.parent
+    
+    def _make_file_entry(self, input_path):
+        """Build the FileEntry for a newly selected file"""
+        return FileEntry(input_path, self._resolve_out_dir(input_path), input_path.stem)
+    
     def get_display_path(self, full_path):
         """Convert full path to display-friendly format"""
         if not full_path:
             return ""
         
-        path_obj = Path(full_path)
-        
-        # Get user's home directory
-        home_dir = Path.home()
+        path = os.path.normpath(os.fspath(full_path))
         
-        try:
-            # If path is in user's home directory, show relative to common folders
-            if path_obj.is_relative_to(home_dir):
-                rel_to_home = path_obj.relative_to(home_dir)
-                parts = rel_to_home.parts
-                
-                # If it's directly in a common folder like Desktop, Documents, etc.
-                if len(parts) > 0 and parts[0] in ['Desktop', 'Documents', 'Downloads', 'Pictures', 'Videos']:
-                    return f".../{parts[0]}"
-                
-        except (ValueError, AttributeError):
-            pass
+        # If path is in user's home directory, show relative to common folders
+        home_prefix = self._HOME_STR + os.sep
+        if path.startswith(home_prefix):
+            top_folder = path[len(home_prefix):].split(os.sep, 1)[0]
+            
+            # If it's directly in a common folder like Desktop, Documents, etc.
+            if top_folder in self._COMMON_DIRS:
+                return f".../{top_folder}"
         
         # Otherwise show just the folder name with ellipsis
-        folder_name = path_obj.name
+        folder_name = os.path.basename(path)
         return f".../{folder_name}"
     
     def select_output_folder(self):
@@ -707,6 +1146,8 @@ class VideoConverterApp:
         if folder:
             self.output_folder = folder
             self.last_output_dir = folder  # Update last used directory
+            for entry in self.selected_files:
+                entry.out_dir = self._resolve_out_dir(entry.input_path)
             
             # Get privacy-friendly display path
             display_path = self.get_display_path(folder)
@@ -721,7 +1162,7 @@ class VideoConverterApp:
 
     def reset_form(self):
         """Reset the UI form to its default state"""
-        if self.animation_running or self.simulated_progress_running:
+        if self.animation_running:
             messagebox.showwarning(
                 "Conversion running",
                 "Please wait for the current conversion to finish before resetting."
@@ -752,24 +1193,55 @@ class VideoConverterApp:
         self.update_max_width_label(700)
         self.full_width_var.set(False)
         self.update_full_width_state()
+        self.hwaccel_var.set(self.default_hwaccel)
+        self.preset_var.set("veryfast")
+        self.crf_var.set(23)
+        self.update_crf_label(23)
+        self.parallel_jobs_var.set(self._pool_workers())
+        self.update_parallel_jobs_label(self._pool_workers())
 
-        self.progress_label.configure(text="")
-        self.progress_bar.set(0)
-        self.progress_bar.grid_remove()
+        self._cancel_after('reset_after_id')
+        self._reset_progress()
 
         self.status_text.delete("0.0", "end")
-        self.used_messages = []
-        self.simulated_progress_running = False
+        self.message_iter = iter(())
         self.stop_funny_messages()
         self.stop_button_animation()
         self.convert_btn.configure(state="normal")
         self.log_status("Form reset to defaults.")
     
     def log_status(self, message):
-        """Add a message to the status text area"""
-        self.status_text.insert("end", message + '\n')
-        self.status_text.see("end")
-        self.root.update_idletasks()
+        """Queue a message for the status text area (safe from any thread, written on the next tick)"""
+        self._log_queue.put(message)
+    
+    def _flush_logs(self):
+        """Write all queued status messages with a single insert"""
+        messages = []
+        while True:
+            try:
+                messages.append(self._log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if messages:
+            self.status_text.insert("end", "\n".join(messages) + '\n')
+            self.status_text.see("end")
+    
+    def _cancel_after(self, attr):
+        """Cancel the pending root.after callback whose id is stored in attr"""
+        after_id = getattr(self, attr)
+        if after_id is not None:
+            self.root.after_cancel(after_id)
+            setattr(self, attr, None)
+    
+    def _ticker(self):
+        """Advance the animations and flush the status log, then reschedule (every TICK_MS)"""
+        self._tick += 1
+        if self.animation_running:
+            self.animate_button()
+        if self.funny_message_running and self._tick >= self._next_funny_tick:
+            self.show_funny_message()
+        self._flush_logs()
+        self.root.after(self.TICK_MS, self._ticker)
     
     def start_button_animation(self):
         """Start the spinning animation on the convert button"""
@@ -783,18 +1255,13 @@ class VideoConverterApp:
         self.convert_btn.configure(text=self.original_btn_text)
     
     def animate_button(self):
-        """Animate the button with a spinning indicator"""
-        if not self.animation_running:
-            return
-        
+        """Show the next frame of the button's spinning indicator"""
         # Spinning characters
         spinners = ["◐", "◓", "◑", "◒"]
         spinner = spinners[self.animation_frame % len(spinners)]
         self.convert_btn.configure(text=f"{spinner}  Converting...  {spinner}")
         
         self.animation_frame += 1
-        # Schedule next frame (100ms = 10fps animation)
-        self.root.after(100, self.animate_button)
     
     def start_conversion(self):
         """Start the conversion process in a separate thread"""
@@ -802,6 +1269,10 @@ class VideoConverterApp:
             messagebox.showwarning("No Files", "Please select at least one video file to convert.")
             return
         
+        # A new batch supersedes the last one's pending reset and toast
+        self._cancel_after('reset_after_id')
+        self.toast.place_forget()
+        
         # Disable convert button during conversion and start animation
         self.convert_btn.configure(state="disabled")
         self.start_button_animation()
@@ -809,63 +1280,132 @@ class VideoConverterApp:
         # Clear previous status
         self.status_text.delete("0.0", "end")
         
-        # Run conversion in separate thread to keep UI responsive
-        thread = threading.Thread(target=self.convert_videos, daemon=True)
+        # Run the batch's event loop in a separate thread to keep UI responsive
+        thread = threading.Thread(target=lambda: asyncio.run(self.convert_videos()), daemon=True)
         thread.start()
     
-    def convert_videos(self):
+    def _ui(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the Tk main thread (safe to call from worker threads)"""
+        if self._closing:
+            return
+        self.root.after(0, lambda: fn(*args, **kwargs))
+    
+    def on_close(self):
+        """Stop any running conversion and clean up before the window closes"""
+        self._stop_jobs()
+        self.root.destroy()
+    
+    def _stop_jobs(self):
+        """Terminate running ffmpeg processes and delete their partial outputs"""
+        with self._jobs_lock:
+            self._closing = True
+            processes = list(self._active_processes)
+            partial_paths = list(self._partial_paths)
+        
+        for process in processes:
+            try:
+                os.kill(process.pid, signal.SIGTERM)
+            except OSError:
+                pass
+        
+        for partial_path in partial_paths:
+            # Windows keeps the file locked until ffmpeg has exited
+            for _ in range(20):
+                try:
+                    os.remove(partial_path)
+                except FileNotFoundError:
+                    break
+                except OSError:
+                    time.sleep(0.1)
+                else:
+                    break
+    
+    async def convert_videos(self):
         """Convert all selected videos to the target format"""
         target_format = self.format_var.get()
         success_count = 0
         total = len(self.selected_files)
         
         # Reset and activate progress bar
-        self.progress_bar.set(0)
-        self.simulated_progress = 0.0
+        self.file_progress = {}
+        self._last_progress_ts = 0.0
+        self._last_progress_val = 0.0
+        self._ui(self.progress_bar.set, 0)
         # Show the progress bar
-        self.progress_bar.grid()
-        self.progress_bar.configure(progress_color="#2A7AE8")
+        self._ui(self.progress_bar.grid)
+        self._ui(self.progress_bar.configure, progress_color="#2A7AE8")
         
         # Reset funny messages
-        self.used_messages = []
+        self.message_iter = iter(())
         
         # Start funny messages once at the beginning (not per file)
-        self.start_funny_messages()
+        self._ui(self.start_funny_messages)
         
         self.log_status(f"Starting conversion to {target_format}...\n")
         self.log_status("=" * 60)
         
-        for index, file_path in enumerate(self.selected_files, 1):
+        # ffmpeg runs out of process, so one event loop can keep several encodes busy
+        workers = max(1, min(total, self.parallel_jobs_var.get()))
+        threads = self.threads_per_job or self._threads_per_invocation(workers)
+        hw_encoder = self.hwaccel_options.get(self.hwaccel_var.get())
+        
+        # Spread NVENC sessions round-robin across GPUs when there is more than one
+        gpu_count = detect_nvidia_gpu_count() if hw_encoder == 'h264_nvenc' else 0
+        
+        completed = 0
+        self._ui(self.progress_label.configure, text=f"Converting {total} file{'s' if total > 1 else ''}...")
+        
+        # Decide every destination up front so parallel jobs never share one
+        output_paths = self._plan_output_paths(target_format)
+        
+        # Create each output folder once, not once per file
+        for out_dir in {entry.out_dir for entry in self.selected_files}:
             try:
-                # Calculate progress range for this file
-                self.current_file_start_progress = (index - 1) / total
-                self.current_file_end_progress = index / total
-                self.simulated_progress = self.current_file_start_progress
-                
-                self.progress_label.configure(text=f"Converting {index} of {total}...")
-                self.root.update_idletasks()
-                
-                # Start simulated progress animation
-                self.start_simulated_progress()
-                
-                result = self.convert_single_video(file_path, target_format)
-                
-                # Stop simulated progress
-                self.stop_simulated_progress()
-                
-                if result:
-                    self.log_status(f"✓ {Path(file_path).name} → {Path(result).name}")
-                    success_count += 1
-                    # Snap to actual completion for this file
-                    self.progress_bar.set(self.current_file_end_progress)
-                    self.root.update_idletasks()
-            except Exception as e:
-                self.stop_simulated_progress()
-                self.log_status(f"✗ {Path(file_path).name}: {str(e)}")
-                # Still advance progress even on failure
-                self.progress_bar.set(index / total)
-                self.root.update_idletasks()
+                out_dir.mkdir(parents=True, exist_ok=True)
+            except OSError as e:
+                self.log_status(f"✗ Could not create {out_dir}: {e}")
+        
+        semaphore = asyncio.Semaphore(workers)
+        
+        async def convert_one(index, entry):
+            nonlocal completed, success_count
+            async with semaphore:
+                if self._closing:
+                    return
+                try:
+                    result = await self.convert_single_video(
+                        entry, output_paths[index], target_format, threads, hw_encoder,
+                        functools.partial(self.report_progress, entry.input_path),
+                        index % gpu_count if gpu_count > 1 else None
+                    )
+                    if result:
+                        self.log_status(f"✓ {entry.input_path.name} → {Path(result).name}")
+                        success_count += 1
+                except Exception as e:
+                    self.log_status(f"✗ {entry.input_path.name}: {str(e)}")
+            
+            # Advance progress on success and failure alike
+            completed += 1
+            self.report_progress(entry.input_path, 1.0)
+            self._ui(self.progress_label.configure, text=f"Converted {completed} of {total}...")
         
+        # Opened on the batch's own thread, which is the only one that uses it
+        self._cache = open_convert_cache()
+        try:
+            await asyncio.gather(*(convert_one(index, entry) for index, entry in enumerate(self.selected_files)))
+        finally:
+            if self._cache is not None:
+                self._cache.close()
+                self._cache = None
+        
+        # Summary
+        self.log_status("=" * 60)
+        self.log_status(f"🎉 Conversion complete: {success_count}/{total} successful")
+        
+        self._ui(self.finish_conversion, success_count, total)
+    
+    def finish_conversion(self, success_count, total):
+        """Restore the UI once a batch is done (runs on the Tk main thread)"""
         # Stop funny messages at the end
         self.stop_funny_messages()
         
@@ -877,50 +1417,37 @@ class VideoConverterApp:
         self.stop_button_animation()
         self.convert_btn.configure(state="normal")
         
-        # Summary
-        self.log_status("=" * 60)
-        self.log_status(f"🎉 Conversion complete: {success_count}/{total} successful")
-        
         if success_count > 0:
-            messagebox.showinfo("Success", 
-                              f"Successfully converted {success_count}/{total} video(s)!")
-        
-        # Reset progress after a delay
-        def reset_progress():
-            self.progress_label.configure(text="")
-            self.progress_bar.set(0)
-            # Hide progress bar when not in use
-            self.progress_bar.grid_remove()
-        
-        self.root.after(3000, reset_progress)
-    
-    def start_simulated_progress(self):
-        """Start the simulated progress animation"""
-        self.simulated_progress_running = True
-        self.animate_simulated_progress()
-    
-    def stop_simulated_progress(self):
-        """Stop the simulated progress animation"""
-        self.simulated_progress_running = False
-    
-    def animate_simulated_progress(self):
-        """Gradually fill progress bar to simulate conversion progress"""
-        if not self.simulated_progress_running:
-            return
-        
-        # Calculate how much of this file's range we can fill (stop at 90% to leave room for completion)
-        max_progress = self.current_file_start_progress + (self.current_file_end_progress - self.current_file_start_progress) * 0.9
+            self.toast_label.configure(text=f"✓ Successfully converted {success_count}/{total} video(s)!")
+            self.toast.place(relx=0.5, y=12, anchor="n")
+            self.toast.lift()
         
-        if self.simulated_progress < max_progress:
-            # Increment progress slowly (smaller increments = smoother animation)
-            increment = (self.current_file_end_progress - self.current_file_start_progress) * 0.02
-            self.simulated_progress = min(self.simulated_progress + increment, max_progress)
-            self.progress_bar.set(self.simulated_progress)
-            self.root.update_idletasks()
-        
-        # Schedule next frame (150ms intervals)
-        if self.simulated_progress_running:
-            self.root.after(150, self.animate_simulated_progress)
+        # Reset progress (and hide the toast) after a delay
+        self.reset_after_id = self.root.after(3000, self._reset_progress)
+    
+    def _reset_progress(self):
+        """Hide the progress bar and toast left over from the last batch"""
+        self.reset_after_id = None
+        self.toast.place_forget()
+        self.progress_label.configure(text="")
+        self.progress_bar.set(0)
+        # Hide progress bar when not in use
+        self.progress_bar.grid_remove()
+    
+    def report_progress(self, file_path, fraction):
+        """Record one file's progress and update the bar with the batch average"""
+        self.file_progress[file_path] = fraction
+        overall = sum(self.file_progress.values()) / max(1, len(self.selected_files))
+        
+        # ffmpeg can report 100+ times a second; repaint at most every 50 ms or
+        # per 1% step, but always show a finished file
+        now = time.monotonic()
+        if (fraction < 1.0 and now - self._last_progress_ts < 0.05
+                and abs(overall - self._last_progress_val) <= 0.01):
+            return
+        self._last_progress_ts = now
+        self._last_progress_val = overall
+        self._ui(self.progress_bar.set, overall)
     
     def start_funny_messages(self):
         """Start displaying funny status messages"""
@@ -932,32 +1459,26 @@ class VideoConverterApp:
         self.funny_message_running = False
     
     def get_random_message(self):
-        """Get a random message that hasn't been used recently"""
-        available = [m for m in self.THINKING_MESSAGES if m not in self.used_messages]
-        if not available:
-            # Reset if we've used all messages
-            self.used_messages = []
-            available = self.THINKING_MESSAGES.copy()
-        
-        message = random.choice(available)
-        self.used_messages.append(message)
-        # Keep only last 10 used messages to allow reuse eventually
-        if len(self.used_messages) > 10:
-            self.used_messages.pop(0)
+        """Get the next message from a shuffled pass over all messages"""
+        message = next(self.message_iter, None)
+        if message is None:
+            # Reshuffle once every message has been shown, moving the most recent
+            # ones to the back so they don't repeat right after the reshuffle
+            order = random.sample(self.THINKING_MESSAGES, len(self.THINKING_MESSAGES))
+            recent = set(self.recent_messages)
+            order.sort(key=lambda m: m in recent)
+            self.message_iter = iter(order)
+            message = next(self.message_iter)
+        self.recent_messages.append(message)
         return message
     
     def show_funny_message(self):
         """Display a funny message in the status area"""
-        if not self.funny_message_running:
-            return
-        
         message = self.get_random_message()
         self.log_status(f"  {message}")
         
         # Show a new message every 8-10 seconds (randomized for natural feel)
-        delay = random.randint(8000, 10000)
-        if self.funny_message_running:
-            self.root.after(delay, self.show_funny_message)
+        self._next_funny_tick = self._tick + random.randint(8000, 10000) // self.TICK_MS
     
     @staticmethod
     def _normalize_dimension(value):
@@ -967,88 +1488,402 @@ class VideoConverterApp:
             even -= 1
         return max(2, even)
     
-    def convert_single_video(self, input_path, target_format):
-        """Convert a single video file"""
-        input_path = Path(input_path)
-        
-        # Determine output path
-        if self.output_folder:
-            output_dir = Path(self.output_folder)
-        else:
-            output_dir = input_path.parent
-        
-        output_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Create output filename
-        output_name = input_path.stem + '.' + target_format.lower()
-        output_path = output_dir / output_name
-        
-        self.log_status(f"Converting {input_path.name}...")
-        
-        clip = None
-        try:
-            clip = VideoFileClip(str(input_path))
-            
-            if target_format == 'GIF':
-                # High-quality GIF conversion
-                fps = self.fps_var.get()
-                scale = self.scale_var.get()
-                
-                # Resize if needed, ensuring ffmpeg-friendly even dims
-                if scale < 1.0:
-                    target_width = self._normalize_dimension(clip.w * scale)
-                    target_height = self._normalize_dimension(clip.h * scale)
-                    clip = clip.resize(newsize=(target_width, target_height))
-                
-                if not self.full_width_var.get():
-                    max_width = self.max_width_var.get()
-                    if clip.w > max_width:
-                        ratio = max_width / clip.w
-                        max_width_even = self._normalize_dimension(max_width)
-                        target_height = self._normalize_dimension(clip.h * ratio)
-                        clip = clip.resize(newsize=(max_width_even, target_height))
-                
-                clip.write_gif(
-                    str(output_path),
-                    fps=fps,
-                    program='ffmpeg',
-                    opt='OptimizePlus',
-                    fuzz=1
-                )
-            else:
-                # Convert to video format
-                codec_map = {
-                    'MP4': 'libx264',
-                    'MOV': 'libx264',
-                    'MKV': 'libx264',
-                    'WEBM': 'libvpx',
-                    'AVI': 'mpeg4'
-                }
+    @staticmethod
+    def _pool_workers():
+        """Default number of files to convert concurrently"""
+        return max(1, (os.cpu_count() or 2) // 2)
+    
+    @staticmethod
+    def _threads_per_invocation(pool_workers):
+        """Split the CPU cores evenly across concurrent ffmpeg processes"""
+        return max(1, (os.cpu_count() or pool_workers) // pool_workers)
+    
+    async def _run_ffmpeg(self, args, duration=None, on_progress=None, input_data=None, capture_output=False):
+        """Run ffmpeg with the given arguments and raise if it fails
+        
+        input_data is fed to ffmpeg's stdin. With capture_output the bytes ffmpeg
+        writes to stdout are returned; otherwise stdout carries -progress reports.
+        """
+        progress_args = [] if capture_output else ['-progress', 'pipe:1']
+        output = None
+        # Only errors reach stderr; it goes to a temp file so it can never fill a pipe
+        # while we read stdout
+        with tempfile.TemporaryFile() as stderr_file:
+            process = await asyncio.create_subprocess_exec(
+                'ffmpeg', '-y', '-hide_banner', '-loglevel', 'error', '-nostats', *progress_args, *args,
+                stdin=subprocess.DEVNULL if input_data is None else subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=stderr_file,
+                limit=self.FFMPEG_PIPE_BUFSIZE,
+                # Own session: a Ctrl-C aimed at the app can't kill ffmpeg mid-write;
+                # _stop_jobs ends it cleanly instead
+                start_new_session=True
+            )
+            with self._jobs_lock:
+                self._active_processes.add(process)
+                closing = self._closing
+            try:
+                if closing:
+                    # The app started closing while this one was launching
+                    os.kill(process.pid, signal.SIGTERM)
                 
-                codec = codec_map.get(target_format, 'libx264')
+                if input_data is not None:
+                    try:
+                        process.stdin.write(input_data)
+                        await process.stdin.drain()
+                        process.stdin.close()
+                    except (BrokenPipeError, ConnectionResetError):
+                        # ffmpeg exited without reading; its exit code says why
+                        pass
                 
-                clip.write_videofile(
-                    str(output_path),
-                    codec=codec,
-                    audio_codec='aac' if target_format in ['MP4', 'MOV', 'MKV'] else 'libvorbis',
-                    logger=None  # Suppress moviepy progress bar
-                )
+                if capture_output:
+                    output = await process.stdout.read()
+                else:
+                    async for line in process.stdout:
+                        key, _, value = line.decode(errors='replace').strip().partition('=')
+                        if on_progress is None:
+                            continue
+                        # out_time_ms is in microseconds despite its name; unlike out_time_us
+                        # it is emitted by every ffmpeg version
+                        if key == 'out_time_ms' and duration and value.isdigit():
+                            on_progress(min(1.0, int(value) / 1_000_000 / duration))
+                        elif key == 'progress' and value == 'end':
+                            on_progress(1.0)
+                await process.wait()
+            finally:
+                with self._jobs_lock:
+                    self._active_processes.discard(process)
+            
+            if process.returncode != 0:
+                stderr_file.seek(0)
+                lines = [
+                    line.strip() for line in stderr_file.read().decode(errors='replace').splitlines()
+                    if line.strip() and line.strip() != "Conversion failed!"
+                ]
+                detail = lines[-1] if lines else f"exit code {process.returncode}"
+                raise RuntimeError(f"ffmpeg failed: {detail}")
+        return output
+    
+    def _probe(self, path):
+        """Return ffprobe metadata for a file, cached until its size or mtime changes"""
+        stat = os.stat(path)
+        return probe_media(str(path), stat.st_mtime_ns, stat.st_size)
+    
+    async def _entry_probe(self, entry):
+        """Return the entry's ffprobe metadata (cached by probe_media until the file changes)"""
+        # ffprobe blocks, so it runs off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, self._probe, entry.input_path)
+    
+    def _gif_target_size(self, width, height):
+        """Apply the GIF resolution and max width settings to the source dimensions"""
+        scale = self.scale_var.get()
+        
+        # Resize if needed, ensuring ffmpeg-friendly even dims
+        if scale < 1.0:
+            width = self._normalize_dimension(width * scale)
+            height = self._normalize_dimension(height * scale)
+        
+        if not self.full_width_var.get():
+            max_width = self.max_width_var.get()
+            if width > max_width:
+                ratio = max_width / width
+                width = self._normalize_dimension(max_width)
+                height = self._normalize_dimension(height * ratio)
+        
+        return width, height
+    
+    def _can_remux(self, probe, target_format):
+        """Check whether the probed source streams can be copied into the target container"""
+        if target_format not in self.REMUX_FORMATS:
+            return False
+        if probe['video_codec'] not in self.REMUX_VIDEO_CODECS:
+            return False
+        if probe['pix_fmt'] not in self.REMUX_PIX_FMTS:
+            return False
+        audio = probe['audio_codec']
+        return audio is None or audio in self.REMUX_AUDIO_CODECS
+    
+    def _build_encode_args(self, input_path, output_path, target_format, threads=None, hw_encoder=None, gpu=None):
+        """Build the ffmpeg arguments for a full re-encode into the target format"""
+        video_codec, audio_codec = self.VIDEO_CODECS.get(target_format, self.VIDEO_CODECS['MP4'])
+        # Hardware encoders stand in for libx264 only
+        if hw_encoder and video_codec == 'libx264':
+            video_codec = hw_encoder
+        
+        args = [*self.ENCODER_INPUT_ARGS.get(video_codec, [])]
+        gpu_args = []
+        if video_codec == 'h264_nvenc' and gpu is not None:
+            # Decode and encode on the same card
+            args += ['-hwaccel_device', str(gpu)]
+            gpu_args = ['-gpu', str(gpu)]
+        args += ['-i', str(input_path)]
+        args += ['-c:v', video_codec, *self.ENCODER_ARGS.get(video_codec, []), *gpu_args]
+        if video_codec == 'libx264':
+            args += ['-preset', self.preset_var.get(), '-crf', str(self.crf_var.get())]
+        # 4:4:4 and 10-bit sources are downsampled once up front instead of taking
+        # the encoders' slow paths (which many players can't decode anyway)
+        pix_fmt = self.ENCODER_PIX_FMTS.get(video_codec, 'yuv420p')
+        if pix_fmt:
+            args += ['-pix_fmt', pix_fmt]
+        args += ['-c:a', audio_codec]
+        if target_format in self.FASTSTART_FORMATS:
+            # Playable in QuickTime/Safari and streamable before fully downloaded
+            args += ['-movflags', '+faststart']
+        if threads:
+            args += ['-threads', str(threads)]
+        args.append(str(output_path))
+        return args
+    
+    def _plan_output_paths(self, target_format):
+        """Pick a distinct output path for each selected file, in selection order
+        
+        A file keeps stem.ext unless that is a selected input or another file's
+        output, in which case it gets stem-converted.ext (then -converted-2, ...).
+        """
+        def key(path):
+            # Resolve symlinks and compare case-insensitively, as macOS and Windows folders usually are
+            return os.path.normcase(os.path.realpath(path)).casefold()
+        
+        extension = target_format.lower()
+        taken = {key(entry.input_path) for entry in self.selected_files}
+        output_paths = []
+        for entry in self.selected_files:
+            output_path = entry.out_dir / f"{entry.out_stem}.{extension}"
+            counter = 1
+            while key(output_path) in taken:
+                suffix = "-converted" if counter == 1 else f"-converted-{counter}"
+                output_path = entry.out_dir / f"{entry.out_stem}{suffix}.{extension}"
+                counter += 1
+            taken.add(key(output_path))
+            output_paths.append(output_path)
+        return output_paths
+    
+    async def convert_single_video(self, entry, output_path, target_format, threads=None, hw_encoder=None,
+                                   on_progress=None, gpu=None):
+        """Convert a single selected file to output_path, calling on_progress(fraction) as ffmpeg advances"""
+        output_dir = entry.out_dir
+        
+        # Converting onto the source itself (also across case-insensitive names):
+        # nothing to do if its streams already fit. Otherwise output_path was
+        # already moved off the input, which is never replaced
+        own_path = output_dir / f"{entry.out_stem}.{target_format.lower()}"
+        if own_path.exists() and os.path.samefile(own_path, entry.input_path):
+            if self._can_remux(await self._entry_probe(entry), target_format):
+                self.log_status(f"  {entry.input_path.name} is already compliant, skipping")
+                return str(own_path)
+        
+        # Converted before with the same source, destination and settings
+        cache_key = self._cache_key(entry, output_path, target_format, hw_encoder)
+        cached = self._cached_output(cache_key)
+        if cached:
+            self.log_status(f"  {entry.input_path.name} was already converted, using cached {Path(cached).name}")
+            return cached
+        
+        # ffmpeg writes next to the final file (same filesystem), which is then
+        # renamed into place so a failed or interrupted run never leaves a partial output.
+        # The name is unique per job; the reserved file is removed again so ffmpeg
+        # creates it with normal permissions rather than mkstemp's 0600
+        fd, partial_name = tempfile.mkstemp(
+            prefix=f".{output_path.stem}.", suffix=f".partial{output_path.suffix}", dir=output_dir
+        )
+        os.close(fd)
+        os.remove(partial_name)
+        partial_path = Path(partial_name)
+        with self._jobs_lock:
+            self._partial_paths.add(partial_path)
+        
+        self.log_status(f"Converting {entry.input_path.name}...")
+        try:
+            await self._encode_file(entry, partial_path, target_format, threads, hw_encoder, on_progress, gpu)
+            os.replace(partial_path, output_path)
+        except Exception:
+            try:
+                os.remove(partial_path)
+            except OSError:
+                pass
+            raise
         finally:
-            if clip:
-                clip.close()
+            with self._jobs_lock:
+                self._partial_paths.discard(partial_path)
         
+        self._remember_output(cache_key, output_path)
         return str(output_path)
+    
+    def _cache_key(self, entry, output_path, target_format, hw_encoder=None):
+        """Hash everything that determines a conversion's output"""
+        stat = os.stat(entry.input_path)
+        if target_format == 'GIF':
+            settings = (self.fps_var.get(), self.scale_var.get(), self.max_width_var.get(), self.full_width_var.get())
+        else:
+            settings = (hw_encoder, self.preset_var.get(), self.crf_var.get())
+        key = (f"{entry.input_path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}|{target_format}|"
+               f"{output_path.resolve()}|{settings}")
+        return hashlib.blake2b(key.encode()).hexdigest()
+    
+    def _cached_output(self, key):
+        """Return the output recorded for key if that exact file is still there"""
+        if self._cache is None:
+            return None
+        try:
+            row = self._cache.execute(
+                "SELECT output, size, mtime_ns FROM conversions WHERE key = ?", (key,)
+            ).fetchone()
+        except sqlite3.Error:
+            return None
+        if not row:
+            return None
+        output, size, mtime_ns = row
+        # A later run with other settings, or the user, may have rewritten the file
+        try:
+            stat = os.stat(output)
+        except OSError:
+            return None
+        if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+            return None
+        return output
+    
+    def _remember_output(self, key, output_path):
+        """Record a finished conversion so an unchanged re-run can skip it"""
+        if self._cache is None:
+            return
+        try:
+            stat = os.stat(output_path)
+            with self._cache:
+                self._cache.execute(
+                    "INSERT OR REPLACE INTO conversions (key, output, size, mtime_ns) VALUES (?, ?, ?, ?)",
+                    (key, str(output_path), stat.st_size, stat.st_mtime_ns)
+                )
+        except (OSError, sqlite3.Error):
+            pass
+    
+    async def _encode_file(self, entry, output_path, target_format, threads=None, hw_encoder=None, on_progress=None,
+                           gpu=None):
+        """Run the ffmpeg passes that turn the entry's input file into output_path"""
+        input_path = entry.input_path
+        probe = await self._entry_probe(entry)
+        duration = probe['duration']
+        
+        if target_format != 'GIF':
+            # Container/codec conversion goes straight to ffmpeg
+            if self._can_remux(probe, target_format):
+                # Compatible streams: remux without re-encoding
+                codec_args = ['-map', '0:v:0', '-map', '0:a:0?', '-c', 'copy']
+                if target_format in self.FASTSTART_FORMATS:
+                    codec_args += ['-movflags', '+faststart']
+                    # Copied HEVC is tagged hev1 by default, which QuickTime, Safari and iOS refuse
+                    if probe['video_codec'] == 'hevc':
+                        codec_args += ['-tag:v', 'hvc1']
+                self.log_status("  Streams are compatible, copying without re-encoding")
+                await self._run_ffmpeg(['-i', str(input_path), *codec_args, str(output_path)], duration, on_progress)
+                return
+            
+            args = self._build_encode_args(input_path, output_path, target_format, threads, hw_encoder, gpu)
+            software_args = self._build_encode_args(input_path, output_path, target_format, threads)
+            try:
+                await self._run_ffmpeg(args, duration, on_progress)
+            except RuntimeError as e:
+                if args == software_args:
+                    raise
+                # Advertised encoders can still be unusable (no GPU, missing driver)
+                self.log_status(f"  {hw_encoder} failed ({e}), retrying with software encoder")
+                await self._run_ffmpeg(software_args, duration, on_progress)
+            return
+        
+        # High-quality GIF conversion with a palette generated for this video
+        fps = self.fps_var.get()
+        if not probe['width'] or not probe['height']:
+            raise RuntimeError("could not read video dimensions")
+        source_size = (probe['width'], probe['height'])
+        width, height = self._gif_target_size(*source_size)
+        filters = f"fps={fps}"
+        # Only scale when the settings actually change the size
+        if (width, height) != source_size:
+            filters += f",scale={width}:{height}:flags=lanczos"
+        thread_args = ['-threads', str(threads)] if threads else []
+        paletteuse = "paletteuse=dither=bayer:bayer_scale=5:diff_mode=rectangle"
+        
+        # One decode can feed both palette generation and the final encode, but
+        # palettegen only emits the palette at EOF, so the split branch holds every
+        # frame in memory until then. Only do that while the frames (up to 4 bytes
+        # per pixel) fit the budget
+        if duration and duration * fps * width * height * 4 <= self.GIF_SINGLE_PASS_MAX_BYTES:
+            await self._run_ffmpeg([
+                '-i', str(input_path),
+                '-filter_complex',
+                f"{filters},split[a][b];[a]palettegen=stats_mode=diff[p];[b][p]{paletteuse}",
+                *thread_args,
+                str(output_path)
+            ], duration, on_progress)
+            return
+        
+        # Longer or larger clips decode twice; the palette stays in memory, piped
+        # out of the first pass and into the second
+        palette = await self._run_ffmpeg([
+            '-i', str(input_path),
+            '-vf', f"{filters},palettegen=stats_mode=diff",
+            *thread_args,
+            '-f', 'image2pipe', '-c:v', 'png', 'pipe:1'
+        ], capture_output=True)
+        
+        # The palette pass reports no progress; count it as the first half of the file
+        encode_progress = None
+        if on_progress:
+            on_progress(0.5)
+            encode_progress = lambda fraction: on_progress(0.5 + fraction / 2)
+        
+        await self._run_ffmpeg([
+            '-i', str(input_path),
+            '-f', 'image2pipe', '-i', 'pipe:0',
+            '-lavfi', f"{filters}[x];[x][1:v]{paletteuse}",
+            *thread_args,
+            str(output_path)
+        ], duration, encode_progress, input_data=palette)
+
+def parse_args(argv=None):
+    """Parse command line options"""
+    parser = argparse.ArgumentParser(description="Video Converter")
+    parser.add_argument(
+        "--threads-per-job",
+        type=int,
+        default=None,
+        metavar="N",
+        help="ffmpeg threads per conversion (default: CPU cores split across parallel jobs)"
+    )
+    args = parser.parse_args(argv)
+    if args.threads_per_job is not None and args.threads_per_job < 1:
+        parser.error("--threads-per-job must be at least 1")
+    return args
+
+
+def activate_macos_app():
+    """Make this process the frontmost application on macOS"""
+    script = f'tell application "System Events" to set frontmost of first process whose unix id is {os.getpid()} to true'
+    try:
+        subprocess.Popen(
+            ['osascript', '-e', script],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+    except OSError:
+        pass
+
 
 def main():
     """Main entry point for the application"""
+    args = parse_args()
+    ensure_ffmpeg_available()
     root = ctk.CTk()
-    app = VideoConverterApp(root)
+    app = VideoConverterApp(root, threads_per_job=args.threads_per_job)
     
     # Bring window to front and focus it (especially important on macOS)
-    root.lift()
-    root.attributes('-topmost', True)
-    root.after_idle(root.attributes, '-topmost', False)
-    root.focus_force()
+    if sys.platform == 'darwin':
+        # Apps started from a terminal open behind it; activate this process
+        # (in the background, so the window paints without waiting on osascript)
+        root.after_idle(activate_macos_app)
+    else:
+        root.lift()
+        root.focus_force()
     
     root.mainloop()
 